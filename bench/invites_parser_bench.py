@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+File: bench/invites_parser_bench.py
+邀玩首页解析后端微基准
+对 bench/fixtures/invites_*.html 中保存的首页逐个运行 invites.PAYLOAD_PARSERS 的每个后端，
+输出单次解析耗时、峰值内存分配，并以 html.parser 的结果为基准校验正确性
+
+用法:
+  python bench/invites_parser_bench.py --repeat 50
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import invites  # noqa: E402
+
+
+def bench_parser(parse, html: bytes, repeat: int):
+    """返回 (结果, 平均耗时ms, 单次峰值内存KB)"""
+    tracemalloc.start()
+    result = parse(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        parse(html)
+    elapsed = (time.perf_counter() - start) / repeat
+    return result, elapsed * 1000, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="邀玩首页解析后端微基准")
+    parser.add_argument("--repeat", type=int, default=50, help="每个后端重复解析次数")
+    parser.add_argument("--fixtures", default=os.path.join(ROOT, "bench", "fixtures", "invites_*.html"),
+                        help="首页样本文件的glob")
+    args = parser.parse_args()
+
+    fixtures = sorted(glob.glob(args.fixtures))
+    if not fixtures:
+        print(f"未找到样本文件: {args.fixtures}")
+        sys.exit(1)
+
+    print(f"{'样本':<24} {'后端':<12} {'耗时(ms)':>10} {'峰值内存(KB)':>14} {'结果'}")
+    for path in fixtures:
+        with open(path, "rb") as f:
+            html = f.read()
+        expected = invites.PAYLOAD_PARSERS["html.parser"](html)
+        for name, parse in invites.PAYLOAD_PARSERS.items():
+            result, elapsed_ms, peak_kb = bench_parser(parse, html, args.repeat)
+            status = "正确" if result == expected and result is not None else "错误"
+            print(f"{os.path.basename(path):<24} {name:<12} {elapsed_ms:>10.3f} {peak_kb:>14.1f} {status}")
+
+
+if __name__ == "__main__":
+    main()
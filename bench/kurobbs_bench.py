@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+File: bench/kurobbs_bench.py
+库街区签到离线吞吐量压测
+在本地启动模拟的 api.kurobbs.com（四个接口，可配置延迟、错误率、401注入），
+用N个虚拟token驱动 KurobbsClient，输出 账号/秒、单账号耗时p50/p99 和峰值内存
+
+用法:
+  python bench/kurobbs_bench.py --accounts 10,100,1000 --concurrency 20 --latency 0.05
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SIGN_LEDGER", "false")
+
+import kurobbs  # noqa: E402
+
+
+class FakeKurobbsHandler(BaseHTTPRequestHandler):
+    """模拟库街区接口"""
+
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    error_rate = 0.0
+    expired_rate = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        if self.latency:
+            time.sleep(self.latency)
+
+        if random.random() < self.error_rate:
+            self._reply(503, {"code": 503, "msg": "服务繁忙"})
+            return
+        if random.random() < self.expired_rate:
+            self._reply(200, {"code": 401, "msg": "登录已过期"})
+            return
+
+        token = self.headers.get("token", "")
+        if self.path == "/user/mineV2":
+            payload = {"code": 200, "success": True, "data": {"mine": {"userId": abs(hash(token)) % 10 ** 8}}}
+        elif self.path == "/gamer/role/default":
+            payload = {"code": 200, "success": True, "data": {"defaultRoleList": [
+                {"gameId": 2, "serverId": "76402e5b20be2c39f095a152090afddc", "roleId": "1", "userId": "1"},
+            ]}}
+        elif self.path in ("/encourage/signIn/v2", "/user/signIn"):
+            payload = {"code": 200, "success": True, "msg": "请求成功"}
+        else:
+            self._reply(404, {"code": 404, "msg": "not found"})
+            return
+        self._reply(200, payload)
+
+
+def start_server(latency: float, error_rate: float, expired_rate: float) -> ThreadingHTTPServer:
+    FakeKurobbsHandler.latency = latency
+    FakeKurobbsHandler.error_rate = error_rate
+    FakeKurobbsHandler.expired_rate = expired_rate
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeKurobbsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_pass(accounts: int, concurrency: int, rate: float):
+    """用accounts个虚拟token跑一轮签到，返回 (结果列表, 单账号耗时列表, 总耗时)"""
+    rate_limiter = kurobbs.RateLimiter(rate)
+    retry_policy = kurobbs.RetryPolicy(base_delay=0.05, budget=accounts * 2)
+    tokens = [f"bench-token-{i}" for i in range(accounts)]
+    latencies = []
+    lock = threading.Lock()
+
+    def one(index_token):
+        idx, token = index_token
+        start = time.monotonic()
+        client = kurobbs.KurobbsClient(token, user_index=idx, rate_limiter=rate_limiter,
+                                       retry_policy=retry_policy)
+        result = client.execute_all_sign()
+        elapsed = time.monotonic() - start
+        with lock:
+            latencies.append(elapsed)
+        return result
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(one, enumerate(tokens, 1)))
+    return results, latencies, time.monotonic() - start
+
+
+def run_once(accounts: int, concurrency: int, rate: float):
+    """先不开tracemalloc跑一轮统计吞吐和耗时，再单独跑一轮统计峰值内存"""
+    results, latencies, wall = run_pass(accounts, concurrency, rate)
+
+    tracemalloc.start()
+    run_pass(accounts, concurrency, rate)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "accounts": accounts,
+        "success": sum(1 for r in results if r.get("success")),
+        "wall_s": round(wall, 3),
+        "accounts_per_s": round(accounts / wall, 2) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "peak_mem_kb": round(peak / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="库街区签到离线压测")
+    parser.add_argument("--accounts", default="10,100,1000", help="账号数，多个用,分隔")
+    parser.add_argument("--concurrency", type=int, default=20, help="并发账号数")
+    parser.add_argument("--rate", type=float, default=0, help="每秒请求数上限，0为不限制")
+    parser.add_argument("--latency", type=float, default=0.05, help="模拟接口延迟(秒)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回503的概率")
+    parser.add_argument("--expired-rate", type=float, default=0.0, help="返回401的概率")
+    parser.add_argument("--json", action="store_true", help="每轮结果输出一行JSON")
+    args = parser.parse_args()
+
+    logging.getLogger("kurobbs").setLevel(logging.CRITICAL)
+
+    # 按生产环境的方式由并发数计算共享连接池大小，避免连接池不足导致的重连干扰结果
+    os.environ["KUROBBS_CONCURRENCY"] = str(args.concurrency)
+    kurobbs._shared_session = None
+
+    server = start_server(args.latency, args.error_rate, args.expired_rate)
+    kurobbs.API_BASE = f"http://127.0.0.1:{server.server_address[1]}"
+
+    try:
+        if not args.json:
+            print(f"{'账号数':>8} {'成功':>6} {'耗时(s)':>9} {'账号/秒':>9} {'p50(ms)':>9} {'p99(ms)':>9} {'峰值内存(KB)':>12}")
+        for accounts in (int(n) for n in args.accounts.split(",") if n.strip()):
+            stats = run_once(accounts, args.concurrency, args.rate)
+            if args.json:
+                print(json.dumps(stats, ensure_ascii=False))
+            else:
+                print(f"{stats['accounts']:>8} {stats['success']:>6} {stats['wall_s']:>9} "
+                      f"{stats['accounts_per_s']:>9} {stats['p50_ms']:>9} {stats['p99_ms']:>9} "
+                      f"{stats['peak_mem_kb']:>12}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
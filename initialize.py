@@ -1,9 +1,17 @@
+import hashlib
+import json
 import logging
+import os
+import sqlite3
+import threading
 import time
 import random
+from datetime import datetime
+
 import notify
 
 message_list = []  # 存储消息数据
+_capture = threading.local()  # 并发处理账号时，各线程暂存自己的消息
 
 
 def init_logger():
@@ -54,7 +62,31 @@ def message(message_content):
     :param message_content:
     :return:
     """
-    message_list.append(message_content)
+    buffer = getattr(_capture, "buffer", None)
+    if buffer is not None:
+        buffer.append(message_content)
+    else:
+        message_list.append(message_content)
+
+
+def begin_capture():
+    """
+    当前线程之后的消息先暂存，不直接写入message_list
+
+    :return:
+    """
+    _capture.buffer = []
+
+
+def end_capture():
+    """
+    结束暂存并返回当前线程暂存的消息，由调用方按顺序合并到message_list
+
+    :return:
+    """
+    buffer = getattr(_capture, "buffer", None) or []
+    _capture.buffer = None
+    return buffer
 
 
 def send_notify(title):
@@ -68,6 +100,126 @@ def send_notify(title):
     notify.send(title, msg)
 
 
+def _ledger_path():
+    """
+    签到记录数据库路径，环境变量SIGN_LEDGER_FILE可覆盖，SIGN_LEDGER=false时关闭
+
+    :return:
+    """
+    if os.environ.get("SIGN_LEDGER", "true").lower() == "false":
+        return None
+    return os.environ.get("SIGN_LEDGER_FILE") or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), ".sign_ledger.db"
+    )
+
+
+def _ledger_connect(path):
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS sign_ledger ("
+        "script TEXT NOT NULL, account TEXT NOT NULL, day TEXT NOT NULL, "
+        "signed_at REAL NOT NULL, PRIMARY KEY (script, account, day))"
+    )
+    return conn
+
+
+def account_key(account):
+    """
+    账号标识（cookie/token/用户名）的sha256，签到记录和本地缓存中只保存该哈希
+
+    :param account:
+    :return:
+    """
+    return hashlib.sha256(account.encode("utf-8")).hexdigest()
+
+
+def load_json_cache(path):
+    """
+    读取以account_key为键的本地JSON缓存，文件不存在或损坏时返回空dict
+
+    :param path: 缓存文件路径
+    :return:
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logging.warning(f"读取缓存文件失败，忽略缓存: {e}")
+        return {}
+
+
+def save_json_cache(path, data):
+    """
+    写回本地JSON缓存，先写临时文件再替换，避免中断时留下半个文件
+
+    :param path: 缓存文件路径
+    :param data: 缓存内容
+    :return: 是否写入成功
+    """
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return True
+    except OSError as e:
+        logging.warning(f"写入缓存文件失败: {e}")
+        return False
+
+
+def ledger_signed_today(script, account):
+    """
+    查询账号今天是否已在该脚本中签到成功，用于重跑时跳过
+
+    :param script: 脚本名
+    :param account: 账号标识（cookie/token/用户名），只保存其哈希
+    :return:
+    """
+    path = _ledger_path()
+    if not path:
+        return False
+    try:
+        conn = _ledger_connect(path)
+        try:
+            row = conn.execute(
+                "SELECT 1 FROM sign_ledger WHERE script = ? AND account = ? AND day = ?",
+                (script, account_key(account), datetime.now().strftime("%Y-%m-%d")),
+            ).fetchone()
+        finally:
+            conn.close()
+        return row is not None
+    except sqlite3.Error as e:
+        logging.warning(f"读取签到记录失败: {e}")
+        return False
+
+
+def ledger_record(script, account):
+    """
+    记录账号今天签到成功
+
+    :param script: 脚本名
+    :param account: 账号标识（cookie/token/用户名），只保存其哈希
+    :return:
+    """
+    path = _ledger_path()
+    if not path:
+        return
+    try:
+        conn = _ledger_connect(path)
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO sign_ledger (script, account, day, signed_at) VALUES (?, ?, ?, ?)",
+                    (script, account_key(account), datetime.now().strftime("%Y-%m-%d"), time.time()),
+                )
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logging.warning(f"写入签到记录失败: {e}")
+
+
 def init():
     """
     延迟时间和日志初始化
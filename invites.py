@@ -8,22 +8,258 @@ cron: 0 0 6 * * ?
 new Env('邀玩（药丸）自动签到');
 Description: 邀玩（药丸）自动签到
 Update: 2025/10/21 修复Cookie刷新机制
+可选环境变量:
+  INVITES_SESSION_FILE  刷新后session的本地缓存文件，默认脚本目录下 .invites_sessions.json
+  INVITES_SESSION_TTL   缓存session的最长有效期(秒)，默认3600
+  INVITES_CONCURRENCY   同时处理的账号数，默认1(逐个处理)
+  INVITES_MAX_ATTEMPTS  刷新和签到请求遇到429/5xx或网络错误时的最多尝试次数，默认3
+  INVITES_PARSER        首页解析后端: scan(默认)/html.parser/lxml(需安装lxml)
 """
 import os
 import sys
+import time
+import random
+import threading
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
 from bs4 import BeautifulSoup
 import json
 import requests
+from requests.adapters import HTTPAdapter
 import logging
 import re
 import initialize
 
 
-def get_refreshed_session(user_cookie):
+SESSION_STORE_FILE = os.environ.get("INVITES_SESSION_FILE") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), ".invites_sessions.json"
+)
+SESSION_TTL = int(os.environ.get("INVITES_SESSION_TTL", "3600") or 0)
+# 服务端认为session失效时返回的状态码：csrfToken不匹配时Flarum返回400 csrf_token_mismatch，未登录返回401
+SESSION_EXPIRED_STATUS = (400, 401)
+_session_store_lock = threading.Lock()
+
+
+def _account_key(user_cookie):
+    """以flarum_remember的哈希作为账号标识"""
+    remember_match = re.search(r'flarum_remember=([^;]+)', user_cookie)
+    account = remember_match.group(1) if remember_match else user_cookie
+    return initialize.account_key(account)
+
+
+def get_cached_session(user_cookie):
+    """
+    读取未过期的缓存session
+    返回: (session_data, flarum_session)，没有可用缓存时返回 (None, None)
+    """
+    if SESSION_TTL <= 0:
+        return None, None
+    with _session_store_lock:
+        entry = initialize.load_json_cache(SESSION_STORE_FILE).get(_account_key(user_cookie))
+    if not entry or not entry.get("flarum_session") or entry.get("expires_at", 0) <= time.time():
+        return None, None
+    return entry["session"], entry["flarum_session"]
+
+
+def save_cached_session(user_cookie, session_data, flarum_session, expires_at):
+    """保存刷新后的flarum_session、csrfToken和过期时间，flarum_remember不落盘"""
+    if SESSION_TTL <= 0:
+        return
+    with _session_store_lock:
+        store = initialize.load_json_cache(SESSION_STORE_FILE)
+        now = time.time()
+        # 顺便清理已过期的账号和旧格式(含完整cookie)的缓存
+        store = {k: v for k, v in store.items()
+                 if v.get("expires_at", 0) > now and "cookie" not in v}
+        store[_account_key(user_cookie)] = {
+            "session": {
+                "userId": session_data.get("userId"),
+                "csrfToken": session_data.get("csrfToken"),
+            },
+            "flarum_session": flarum_session,
+            "expires_at": min(expires_at or now + SESSION_TTL, now + SESSION_TTL),
+        }
+        initialize.save_json_cache(SESSION_STORE_FILE, store)
+
+
+def drop_cached_session(user_cookie):
+    """session失效时删除缓存"""
+    with _session_store_lock:
+        store = initialize.load_json_cache(SESSION_STORE_FILE)
+        if store.pop(_account_key(user_cookie), None) is not None:
+            initialize.save_json_cache(SESSION_STORE_FILE, store)
+
+
+# 所有账号共用一个连接池，每个账号单独一个Session(独立的cookie jar)
+_adapter = HTTPAdapter(
+    pool_connections=2,
+    pool_maxsize=max(4, int(os.environ.get("INVITES_CONCURRENCY", "1") or 1)),
+)
+
+
+def new_account_session():
+    """创建账号专用的Session，刷新和签到共用，连接来自共享连接池"""
+    session = requests.Session()
+    session.mount('https://', _adapter)
+    session.mount('http://', _adapter)
+    return session
+
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+MAX_ATTEMPTS = max(1, int(os.environ.get("INVITES_MAX_ATTEMPTS", "3") or 1))
+
+
+def _retry_delay(attempt, retry_after=None):
+    """指数退避+全抖动，服务端给出Retry-After(秒数或HTTP日期)时优先使用，最长30秒"""
+    if retry_after:
+        try:
+            return min(30.0, max(0.0, float(retry_after)))
+        except ValueError:
+            pass
+        try:
+            return min(30.0, max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time()))
+        except (TypeError, ValueError):
+            pass
+    return random.uniform(0, min(30.0, 2 ** attempt))
+
+
+def request_with_retry(session, method, url, **kwargs):
+    """
+    发送请求，遇到429/5xx、超时或连接错误时退避重试
+    签到PATCH在服务端是幂等的，可以安全重试
+    """
+    for attempt in range(MAX_ATTEMPTS):
+        last_attempt = attempt == MAX_ATTEMPTS - 1
+        try:
+            response = session.request(method, url, **kwargs)
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+            if last_attempt:
+                raise
+            delay = _retry_delay(attempt)
+            logging.warning(f"请求失败: {e}，{delay:.1f}秒后重试")
+            time.sleep(delay)
+            continue
+        if response.status_code not in RETRY_STATUSES or last_attempt:
+            return response
+        delay = _retry_delay(attempt, response.headers.get('Retry-After'))
+        logging.warning(f"请求返回 {response.status_code}，{delay:.1f}秒后重试")
+        response.close()
+        time.sleep(delay)
+
+
+def _find_cookie(session, name):
+    """从Session的cookie jar中取出指定cookie，不存在时返回None"""
+    found = None
+    for cookie in session.cookies:
+        if cookie.name == name:
+            found = cookie
+    return found
+
+
+def _load_cookie_string(session, cookie_string):
+    """把 "a=b; c=d" 形式的cookie写入Session的cookie jar"""
+    for part in cookie_string.split(';'):
+        name, sep, value = part.strip().partition('=')
+        if sep and name:
+            session.cookies.set(name, value, domain='invites.fun', path='/')
+
+
+FLARUM_PAYLOAD_START = re.compile(rb'<script\b[^>]*\bid=["\']?flarum-json-payload["\']?[^>]*>', re.I)
+FLARUM_PAYLOAD_END = re.compile(rb'</script\s*>', re.I)
+
+
+def parse_payload_scan(html):
+    """直接扫描字节查找 flarum-json-payload，不构建DOM"""
+    start_match = FLARUM_PAYLOAD_START.search(html)
+    if not start_match:
+        return None
+    end_match = FLARUM_PAYLOAD_END.search(html, start_match.end())
+    if not end_match:
+        return None
+    return json.loads(bytes(html[start_match.end():end_match.start()]).decode('utf-8'))
+
+
+def _bs4_payload_parser(features):
+    """生成使用指定BeautifulSoup解析器的提取函数"""
+    def parse(html):
+        soup = BeautifulSoup(bytes(html).decode('utf-8', errors='replace'), features)
+        script_tag = soup.find('script', attrs={'id': 'flarum-json-payload'})
+        if not script_tag:
+            return None
+        return json.loads(script_tag.text)
+    return parse
+
+
+# 可选的页面解析后端，lxml 仅在已安装时可用
+PAYLOAD_PARSERS = {
+    'scan': parse_payload_scan,
+    'html.parser': _bs4_payload_parser('html.parser'),
+}
+if importlib.util.find_spec('lxml') is not None:
+    PAYLOAD_PARSERS['lxml'] = _bs4_payload_parser('lxml')
+PAYLOAD_PARSER = os.environ.get('INVITES_PARSER', 'scan')
+
+
+def extract_flarum_payload(response, parser=None):
+    """
+    从响应中提取 flarum-json-payload 并解析为dict
+    scan 后端边读边查找，拿到完整的script块后立即停止读取，找不到时回退到BeautifulSoup；
+    其他后端读取完整页面后解析
+    """
+    name = parser or PAYLOAD_PARSER
+    if name not in PAYLOAD_PARSERS:
+        logging.warning(f"未知的解析器 {name}，使用 scan")
+        name = 'scan'
+
+    if name != 'scan':
+        try:
+            return PAYLOAD_PARSERS[name](response.content)
+        finally:
+            response.close()
+
+    buffer = bytearray()
+    payload_start = None
+    scan_from = 0
+    try:
+        for chunk in response.iter_content(chunk_size=16384):
+            if not chunk:
+                continue
+            buffer += chunk
+            if payload_start is None:
+                # 回退一段距离，防止开始标签被切在两个chunk之间
+                match = FLARUM_PAYLOAD_START.search(buffer, max(0, scan_from - 256))
+                scan_from = len(buffer)
+                if not match:
+                    continue
+                payload_start = match.end()
+            end_match = FLARUM_PAYLOAD_END.search(buffer, payload_start)
+            if end_match:
+                return json.loads(bytes(buffer[payload_start:end_match.start()]).decode('utf-8'))
+    finally:
+        response.close()
+
+    # 兜底：完整解析已读取的页面
+    fallback = PAYLOAD_PARSERS.get('lxml') or PAYLOAD_PARSERS['html.parser']
+    return fallback(buffer)
+
+
+def find_user_attributes(parsed_data, user_id):
+    """从flarum-json-payload的resources中找出当前用户的attributes"""
+    if not user_id:
+        return {}
+    for resource in parsed_data.get("resources") or []:
+        if resource.get("type") == "users" and str(resource.get("id")) == str(user_id):
+            return resource.get("attributes") or {}
+    return {}
+
+
+def get_refreshed_session(user_cookie, session=None):
     """
     获取刷新后的session
     返回: (session_data, refreshed_cookie)
     """
+    session = session or new_account_session()
     url = 'https://invites.fun/'
     
     # 从原始cookie中提取flarum_remember
@@ -50,46 +286,53 @@ def get_refreshed_session(user_cookie):
         'Referer': 'https://invites.fun/',
         'Accept-Encoding': 'gzip, deflate, br',
         'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6',
-        'Cookie': f'flarum_remember={flarum_remember}'  # 只使用remember来获取新session
     }
+    # 只使用remember来获取新session
+    session.cookies.clear()
+    session.cookies.set('flarum_remember', flarum_remember, domain='invites.fun', path='/')
 
     try:
-        response = requests.get(url, headers=headers, timeout=30)
+        response = request_with_retry(session, 'GET', url, headers=headers, timeout=30, stream=True)
         response.raise_for_status()
         
-        # 从响应头中获取刷新的flarum_session
-        set_cookie = response.headers.get('Set-Cookie', '')
-        session_match = re.search(r'flarum_session=([^;]+)', set_cookie)
+        # 刷新的flarum_session由cookie jar从Set-Cookie中接收
+        session_cookie = _find_cookie(session, 'flarum_session')
         
         refreshed_session = None
-        if session_match:
-            refreshed_session = session_match.group(1)
+        session_expires = None
+        if session_cookie:
+            refreshed_session = session_cookie.value
+            session_expires = session_cookie.expires
             initialize.info_message("成功获取刷新后的session")
         else:
             # 如果没有新的session，尝试从原有cookie中提取
             old_session_match = re.search(r'flarum_session=([^;]+)', user_cookie)
             if old_session_match:
                 refreshed_session = old_session_match.group(1)
+                session.cookies.set('flarum_session', refreshed_session, domain='invites.fun', path='/')
                 initialize.info_message("使用原有session")
         
         # 解析页面数据获取用户信息
-        soup = BeautifulSoup(response.content.decode('utf-8'), "html.parser")
-        script_tag = soup.find('script', attrs={'id': 'flarum-json-payload'})
-        if not script_tag:
+        parsed_data = extract_flarum_payload(response)
+        if parsed_data is None:
             initialize.error_message("未找到用户数据")
             return None, None
             
-        soup_data = script_tag.text
-        parsed_data = json.loads(soup_data)
         session_data = parsed_data.get("session", {})
         
         if not session_data:
             initialize.error_message("解析用户数据失败")
             return None, None
+        
+        # 附带当前用户的属性（含签到状态），签到前据此判断是否已签到
+        session_data["user"] = find_user_attributes(parsed_data, session_data.get("userId"))
             
         # 构建刷新后的完整cookie
         refreshed_cookie = f"flarum_remember={flarum_remember}; flarum_session={refreshed_session}"
         
+        if check_cookie_validity(session_data) and refreshed_session:
+            save_cached_session(user_cookie, session_data, refreshed_session, session_expires)
+        
         return session_data, refreshed_cookie
         
     except Exception as e:
@@ -97,8 +340,15 @@ def get_refreshed_session(user_cookie):
         return None, None
 
 
-def sign_in(user_session, refreshed_cookie):
-    """执行签到"""
+def sign_in(user_session, refreshed_cookie, session=None, from_cache=False):
+    """
+    执行签到
+    from_cache: 使用的是缓存的session，此时除429/5xx外的非200响应都视为session失效
+    返回: True 成功，False 失败，None session已失效需要重新刷新
+    """
+    if session is None:
+        session = new_account_session()
+        _load_cookie_string(session, refreshed_cookie)
     user_id = user_session.get('userId')
     csrf_token = user_session.get('csrfToken')
     
@@ -110,6 +360,14 @@ def sign_in(user_session, refreshed_cookie):
         initialize.error_message("获取不到CSRF Token")
         return False
 
+    # 页面数据已表明今天签过到，不再发送PATCH
+    user_attributes = user_session.get('user') or {}
+    if user_attributes.get('canCheckin') is False:
+        username = user_attributes.get('username', user_id)
+        total_continuous_check_in = user_attributes.get('totalContinuousCheckIn', 0)
+        initialize.info_message(f"用户 {username} 今日已签到，已连续签到 {total_continuous_check_in} 天")
+        return True
+
     initialize.info_message(f"用户id：{user_id} 开始签到")
 
     url = f"https://invites.fun/api/users/{user_id}"
@@ -132,7 +390,6 @@ def sign_in(user_session, refreshed_cookie):
         "Referer": "https://invites.fun/",
         "Accept-Encoding": "gzip, deflate, br",
         "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6",
-        "Cookie": refreshed_cookie  # 使用刷新后的cookie
     }
 
     data = {
@@ -147,7 +404,7 @@ def sign_in(user_session, refreshed_cookie):
     }
 
     try:
-        response = requests.patch(url, headers=headers, json=data, timeout=30)
+        response = request_with_retry(session, 'PATCH', url, headers=headers, json=data, timeout=30)
         
         if response.status_code == 200:
             res_parsed_data = json.loads(response.text)
@@ -156,6 +413,10 @@ def sign_in(user_session, refreshed_cookie):
             total_continuous_check_in = attributes["totalContinuousCheckIn"]
             initialize.info_message(f"用户 {username} 签到成功，已连续签到 {total_continuous_check_in} 天")
             return True
+        elif response.status_code in SESSION_EXPIRED_STATUS or (
+                from_cache and response.status_code not in RETRY_STATUSES):
+            logging.info(f"session已失效，状态码: {response.status_code}")
+            return None
         else:
             initialize.error_message(f"签到失败，状态码: {response.status_code}")
             initialize.info_message(f"响应内容: {response.text}")
@@ -180,6 +441,63 @@ def check_cookie_validity(user_session):
     return True
 
 
+def process_account(index, total_count, cookie):
+    """处理单个账号，返回是否签到成功"""
+    initialize.info_message(f"处理第 {index}/{total_count} 个账号")
+    
+    # 今日已签到成功的账号不再发送请求
+    if initialize.ledger_signed_today("invites", cookie):
+        initialize.info_message("今日已签到成功，跳过")
+        return True
+    
+    # 刷新和签到共用同一个Session，复用连接和cookie jar
+    http_session = new_account_session()
+    
+    # 优先使用缓存的session直接签到
+    result = None
+    session, flarum_session = get_cached_session(cookie)
+    remember_match = re.search(r'flarum_remember=([^;]+)', cookie)
+    if session and remember_match:
+        initialize.info_message("使用缓存的session")
+        # 缓存中只有flarum_session，flarum_remember取自INVITES_COOKIE
+        refreshed_cookie = f"flarum_remember={remember_match.group(1)}; flarum_session={flarum_session}"
+        _load_cookie_string(http_session, refreshed_cookie)
+        result = sign_in(session, refreshed_cookie, http_session, from_cache=True)
+        if result is None:
+            drop_cached_session(cookie)
+    
+    if result is None:
+        # 获取刷新后的session和cookie
+        session, refreshed_cookie = get_refreshed_session(cookie, http_session)
+        
+        if not check_cookie_validity(session):
+            initialize.error_message("Cookie无效或已过期，请更新Cookie")
+            return False
+        
+        result = sign_in(session, refreshed_cookie, http_session)
+        if result is None:
+            initialize.error_message("签到失败，session已失效")
+            drop_cached_session(cookie)
+    
+    if result:
+        initialize.ledger_record("invites", cookie)
+    
+    logging.info('\n')
+    initialize.message('\n')
+    return bool(result)
+
+
+def process_account_captured(index, total_count, cookie):
+    """在工作线程中处理账号，消息暂存后返回，保证通知内容按账号顺序排列"""
+    initialize.begin_capture()
+    try:
+        success = process_account(index, total_count, cookie)
+    except Exception as e:
+        initialize.error_message(f"处理账号异常: {str(e)}")
+        success = False
+    return success, initialize.end_capture()
+
+
 if __name__ == "__main__":
     initialize.init()
     initialize.info_message("开始邀玩（药丸）自动签到\n")
@@ -190,24 +508,27 @@ if __name__ == "__main__":
         initialize.error_message("请在环境变量中填写INVITES_COOKIE的值")
         sys.exit()
 
-    success_count = 0
-    total_count = len(cookies.split("&"))
+    cookie_list = [c.strip() for c in cookies.split("&")]
+    total_count = len(cookie_list)
+    concurrency = int(os.environ.get("INVITES_CONCURRENCY", "1") or 1)
     
-    for i, cookie in enumerate(cookies.split("&"), 1):
-        initialize.info_message(f"处理第 {i}/{total_count} 个账号")
-        
-        # 获取刷新后的session和cookie
-        session, refreshed_cookie = get_refreshed_session(cookie.strip())
-        
-        if not check_cookie_validity(session):
-            initialize.error_message("Cookie无效或已过期，请更新Cookie")
-            continue
-            
-        if sign_in(session, refreshed_cookie):
-            success_count += 1
-            
-        logging.info('\n')
-        initialize.message('\n')
+    if concurrency > 1 and total_count > 1:
+        initialize.info_message(f"并发处理账号，并发数: {concurrency}")
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [
+                executor.submit(process_account_captured, i, total_count, cookie)
+                for i, cookie in enumerate(cookie_list, 1)
+            ]
+            outcomes = [f.result() for f in futures]
+        success_count = 0
+        for success, messages in outcomes:
+            initialize.message_list.extend(messages)
+            success_count += success
+    else:
+        success_count = sum(
+            process_account(i, total_count, cookie)
+            for i, cookie in enumerate(cookie_list, 1)
+        )
 
     # 发送通知
     initialize.send_notify(f"邀玩（药丸）签到完成 - 成功: {success_count}/{total_count}")
@@ -8,6 +8,21 @@ cron: 0 0 6 * * ?
 库街区(Kurobbs)自动签到脚本 - 增强版
 适配青龙面板环境变量
 增加token自动刷新检测
+可选环境变量:
+  KUROBBS_CONCURRENCY  并发账号数，默认1(逐个执行)
+  KUROBBS_RATE_LIMIT   并发模式下每个host每秒请求数上限，默认5
+  KUROBBS_CACHE_FILE   角色列表缓存文件路径，默认脚本目录下 .kurobbs_cache.json
+  KUROBBS_CACHE_TTL    缓存有效期(秒)，默认604800(7天)，0表示禁用缓存
+  KUROBBS_GAME_IDS     只签到指定gameId的角色，多个用,分隔，默认签到全部角色
+  KUROBBS_API_BASE     API地址，默认 https://api.kurobbs.com（压测时指向本地模拟服务）
+  KUROBBS_ROLE_CONCURRENCY 单个账号同时签到的角色数上限，默认4
+  KUROBBS_POOL_SIZE    共享连接池大小，默认为 max(10, 并发数*(角色并发数+1))，
+                       即每个账号最多同时占用角色并发数个连接，再加一个给并行的社区签到
+  KUROBBS_PARALLEL_SIGN 为true时游戏签到与社区签到同时进行，默认false
+  SIGN_LEDGER          为false时不跳过今日已签到成功的账号，默认true
+  KUROBBS_SLOW_MS      单次请求超过该耗时(毫秒)时输出慢请求日志，默认2000
+  KUROBBS_MAX_ATTEMPTS 单个请求最多尝试次数，默认3
+  KUROBBS_RETRY_BUDGET 本次运行所有账号共享的重试次数上限，默认100
 """
 
 import os
@@ -15,10 +30,17 @@ import sys
 import json
 import time
 import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Any
+from email.utils import parsedate_to_datetime
+from typing import List, Dict, Any, Optional
+from urllib.parse import urlparse
 
 import requests
+import initialize
+from http.cookiejar import DefaultCookiePolicy
+from requests.adapters import HTTPAdapter
 
 # 设置日志
 import logging
@@ -32,13 +54,215 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+class RateLimiter:
+    """按host限制请求速率，多账号并发时代替固定的随机等待"""
+
+    def __init__(self, rate: float):
+        # rate: 每个host每秒允许的请求数，<=0 表示不限制
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot: Dict[str, float] = {}
+
+    def acquire(self, url: str):
+        """等待直到该host有可用的请求配额"""
+        if not self.interval:
+            return
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        wait = slot - now
+        if wait > 0:
+            time.sleep(wait)
+
+
+API_BASE = os.environ.get("KUROBBS_API_BASE", "https://api.kurobbs.com").rstrip("/")
+ROLE_CONCURRENCY = max(1, int(os.environ.get("KUROBBS_ROLE_CONCURRENCY", "4") or 4))
+
+_shared_session: Optional[requests.Session] = None
+_shared_session_lock = threading.Lock()
+
+
+def get_shared_session() -> requests.Session:
+    """
+    获取进程内所有账号共享的连接池Session，避免每个账号重新握手
+    账号相关的请求头(token/devcode等)按请求发送，不写入Session
+    """
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is None:
+            concurrency = int(os.environ.get("KUROBBS_CONCURRENCY", "1") or 1)
+            # 每个账号最多 ROLE_CONCURRENCY 个角色签到请求 + 1 个并行的社区签到请求同时在途
+            pool_size = int(os.environ.get("KUROBBS_POOL_SIZE", "0") or 0) or \
+                max(10, concurrency * (ROLE_CONCURRENCY + 1))
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            # 不保存服务端下发的cookie，防止账号之间串用
+            session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+            _shared_session = session
+        return _shared_session
+
+
+class RetryPolicy:
+    """指数退避+全抖动的重试策略，支持Retry-After，所有账号共享一个重试预算"""
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 1.0, max_delay: float = 30.0,
+                 budget: int = 100):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self._lock = threading.Lock()
+
+    def _parse_retry_after(self, retry_after: Optional[str]) -> Optional[float]:
+        if not retry_after:
+            return None
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def next_delay(self, attempt: int, retry_after: Optional[str] = None) -> Optional[float]:
+        """
+        返回第attempt次(从0开始)失败后的等待秒数，不应再重试时返回None
+        """
+        if attempt + 1 >= self.max_attempts:
+            return None
+        with self._lock:
+            if self.budget <= 0:
+                return None
+            self.budget -= 1
+        delay = self._parse_retry_after(retry_after)
+        if delay is None:
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        return min(delay, self.max_delay)
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy(
+    max_attempts=int(os.environ.get("KUROBBS_MAX_ATTEMPTS", "3") or 3),
+    budget=int(os.environ.get("KUROBBS_RETRY_BUDGET", "100") or 0),
+)
+
+
+class RequestTracer:
+    """按接口统计每次请求(含重试)的耗时分布，并记录慢请求"""
+
+    BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000)
+
+    def __init__(self, slow_ms: float = 2000):
+        self.slow_ms = slow_ms
+        self._lock = threading.Lock()
+        self._samples: Dict[str, List[float]] = {}
+        self._statuses: Dict[str, Dict[str, int]] = {}
+
+    def record(self, url: str, attempt: int, status: Any, elapsed: float, user_index: int = 0):
+        """记录一次请求的耗时(秒)和状态(HTTP状态码或异常名)"""
+        endpoint = urlparse(url).path
+        elapsed_ms = elapsed * 1000
+        with self._lock:
+            self._samples.setdefault(endpoint, []).append(elapsed_ms)
+            statuses = self._statuses.setdefault(endpoint, {})
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        if elapsed_ms >= self.slow_ms:
+            logger.warning(
+                f"账号{user_index}: 慢请求 {endpoint} 第{attempt + 1}次尝试 状态{status} 耗时{elapsed_ms:.0f}ms"
+            )
+
+    def summary_lines(self) -> List[str]:
+        """生成各接口的耗时直方图摘要"""
+        with self._lock:
+            samples = {k: sorted(v) for k, v in self._samples.items()}
+            statuses = {k: dict(v) for k, v in self._statuses.items()}
+        lines = []
+        for endpoint, values in sorted(samples.items()):
+            count = len(values)
+            p50 = values[int(0.50 * (count - 1))]
+            p99 = values[int(0.99 * (count - 1))]
+            status_text = ", ".join(f"{k}×{v}" for k, v in sorted(statuses[endpoint].items()))
+            lines.append(
+                f"{endpoint}: {count}次 p50={p50:.0f}ms p99={p99:.0f}ms max={values[-1]:.0f}ms 状态[{status_text}]"
+            )
+            buckets = []
+            lower = 0
+            for upper in self.BUCKETS_MS:
+                n = sum(1 for v in values if lower <= v < upper)
+                if n:
+                    buckets.append(f"<{upper}ms:{n}")
+                lower = upper
+            n = sum(1 for v in values if v >= lower)
+            if n:
+                buckets.append(f">={lower}ms:{n}")
+            lines.append("    " + " ".join(buckets))
+        return lines
+
+
+TRACER = RequestTracer(slow_ms=float(os.environ.get("KUROBBS_SLOW_MS", "2000") or 2000))
+
+
+class TokenCache:
+    """按token哈希缓存默认角色列表，减少每次签到前的查询请求"""
+
+    def __init__(self, path: str, ttl: int):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._data: Dict[str, Dict[str, Any]] = initialize.load_json_cache(path)
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return initialize.account_key(token)
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """获取未过期的缓存项"""
+        with self._lock:
+            entry = self._data.get(self._key(token))
+        if not entry or time.time() - entry.get("updated", 0) > self.ttl:
+            return None
+        return entry
+
+    def set(self, token: str, role_list: List[Dict[str, Any]]):
+        with self._lock:
+            self._data[self._key(token)] = {
+                "role_list": role_list,
+                "updated": time.time(),
+            }
+            self._dirty = True
+
+    def invalidate(self, token: str):
+        with self._lock:
+            if self._data.pop(self._key(token), None) is not None:
+                self._dirty = True
+
+    def save(self):
+        """有变更时写回缓存文件"""
+        with self._lock:
+            if not self._dirty:
+                return
+            if initialize.save_json_cache(self.path, self._data):
+                self._dirty = False
+
+
 class KurobbsClient:
     """库街区签到客户端"""
     
-    def __init__(self, token: str, user_index: int = 1):
+    def __init__(self, token: str, user_index: int = 1, rate_limiter: Optional[RateLimiter] = None,
+                 cache: Optional[TokenCache] = None, retry_policy: Optional[RetryPolicy] = None):
         self.token = token.strip()
         self.user_index = user_index
-        self.session = requests.Session()
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.retry_policy = retry_policy or DEFAULT_RETRY_POLICY
+        self.session = get_shared_session()
         
         if not self.token:
             raise ValueError("TOKEN不能为空")
@@ -83,20 +307,40 @@ class KurobbsClient:
             "user-agent": f"okhttp/3.10.0 {device['model']}",
         }
         
-        self.session.headers.update(self.headers)
-        
     def _make_request(self, url: str, data: Dict[str, Any] = None, method: str = "POST") -> Dict[str, Any]:
         """发送请求"""
-        max_retries = 3
-        for attempt in range(max_retries):
+        policy = self.retry_policy
+        for attempt in range(policy.max_attempts):
             try:
-                if method.upper() == "POST":
-                    response = self.session.post(url, data=data, timeout=15)
-                else:
-                    response = self.session.get(url, params=data, timeout=15)
+                if self.rate_limiter:
+                    self.rate_limiter.acquire(url)
+                start = time.monotonic()
+                try:
+                    if method.upper() == "POST":
+                        response = self.session.post(url, data=data, headers=self.headers, timeout=15)
+                    else:
+                        response = self.session.get(url, params=data, headers=self.headers, timeout=15)
+                except requests.exceptions.RequestException as e:
+                    TRACER.record(url, attempt, type(e).__name__, time.monotonic() - start, self.user_index)
+                    raise
+                TRACER.record(url, attempt, response.status_code, time.monotonic() - start, self.user_index)
+                
+                # 限流和服务端错误按策略退避重试
+                if response.status_code in policy.RETRY_STATUSES:
+                    delay = policy.next_delay(attempt, response.headers.get("Retry-After"))
+                    if delay is None:
+                        logger.error(f"请求失败: HTTP {response.status_code}，不再重试")
+                        return {"code": response.status_code, "msg": f"网络请求失败: HTTP {response.status_code}"}
+                    logger.warning(f"HTTP {response.status_code}，{delay:.1f}秒后第{attempt + 1}次重试...")
+                    time.sleep(delay)
+                    continue
                 
                 response.raise_for_status()
-                result = response.json()
+                try:
+                    result = response.json()
+                except (requests.exceptions.JSONDecodeError, json.JSONDecodeError):
+                    logger.error("响应解析失败")
+                    return {"code": 500, "msg": "响应解析失败"}
                 
                 # 检查token是否过期
                 if result.get("code") == 401 or "登录已过期" in str(result.get("msg", "")):
@@ -105,29 +349,28 @@ class KurobbsClient:
                 
                 return result
                 
-            except requests.exceptions.Timeout:
-                logger.warning(f"请求超时，第{attempt + 1}次重试...")
-                time.sleep(2)
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                delay = policy.next_delay(attempt)
+                if delay is None:
+                    logger.error(f"请求失败: {str(e)}")
+                    return {"code": 500, "msg": f"网络请求失败: {str(e)}"}
+                logger.warning(f"请求超时或连接失败，{delay:.1f}秒后第{attempt + 1}次重试...")
+                time.sleep(delay)
             except requests.exceptions.RequestException as e:
                 logger.error(f"请求失败: {str(e)}")
-                if attempt == max_retries - 1:
-                    return {"code": 500, "msg": f"网络请求失败: {str(e)}"}
-                time.sleep(1)
-            except json.JSONDecodeError:
-                logger.error("响应解析失败")
-                return {"code": 500, "msg": "响应解析失败"}
+                return {"code": 500, "msg": f"网络请求失败: {str(e)}"}
         
         return {"code": 500, "msg": "请求失败"}
     
     def get_user_info(self) -> Dict[str, Any]:
         """获取用户信息"""
-        url = "https://api.kurobbs.com/user/mineV2"
+        url = f"{API_BASE}/user/mineV2"
         data = {"type": 1}
         return self._make_request(url, data)
     
     def get_game_roles(self, user_id: str) -> Dict[str, Any]:
         """获取游戏角色列表"""
-        url = "https://api.kurobbs.com/gamer/role/default"
+        url = f"{API_BASE}/gamer/role/default"
         data = {"queryUserId": user_id}
         return self._make_request(url, data)
     
@@ -135,49 +378,101 @@ class KurobbsClient:
         """执行游戏签到"""
         logger.info(f"账号{self.user_index}: 开始游戏签到...")
         
-        # 获取用户信息
-        user_result = self.get_user_info()
-        if user_result.get("code") != 200:
-            return user_result
-        
-        user_data = user_result.get("data", {})
-        user_id = user_data.get("mine", {}).get("userId")
-        
-        if not user_id:
-            return {"code": 400, "msg": "无法获取用户ID"}
-        
-        # 获取游戏角色
-        roles_result = self.get_game_roles(str(user_id))
-        if roles_result.get("code") != 200:
-            return roles_result
-        
-        roles_data = roles_result.get("data", {})
-        role_list = roles_data.get("defaultRoleList", [])
-        
-        if not role_list:
-            return {"code": 400, "msg": "未找到游戏角色"}
-        
-        # 使用第一个角色
-        role = role_list[0]
-        current_month = datetime.now().strftime("%m")
-        
-        # 执行签到
-        url = "https://api.kurobbs.com/encourage/signIn/v2"
+        cached = self.cache.get(self.token) if self.cache else None
+        if cached:
+            role_list = cached["role_list"]
+        else:
+            # 获取用户信息
+            user_result = self.get_user_info()
+            if user_result.get("code") != 200:
+                return user_result
+            
+            user_data = user_result.get("data", {})
+            user_id = user_data.get("mine", {}).get("userId")
+            
+            if not user_id:
+                return {"code": 400, "msg": "无法获取用户ID"}
+            
+            # 获取游戏角色
+            roles_result = self.get_game_roles(str(user_id))
+            if roles_result.get("code") != 200:
+                return roles_result
+            
+            roles_data = roles_result.get("data", {})
+            role_list = roles_data.get("defaultRoleList", [])
+            
+            if not role_list:
+                return {"code": 400, "msg": "未找到游戏角色"}
+        all_roles = role_list
+        
+        # 按配置筛选需要签到的角色
+        game_ids = os.environ.get("KUROBBS_GAME_IDS", "")
+        if game_ids:
+            wanted = {g.strip() for g in game_ids.split(",") if g.strip()}
+            role_list = [r for r in role_list if str(r.get("gameId", 2)) in wanted]
+            if not role_list:
+                return {"code": 400, "msg": f"未找到gameId为{game_ids}的游戏角色"}
+        
+        # 角色并发签到，同时在途的请求数不超过 ROLE_CONCURRENCY，与共享连接池大小对应
+        if len(role_list) == 1:
+            role_results = [self._sign_role(role_list[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(len(role_list), ROLE_CONCURRENCY)) as executor:
+                role_results = list(executor.map(self._sign_role, role_list))
+        
+        failed = [r for r in role_results if r["result"].get("code") != 200]
+        # 全部角色签到成功后才写入缓存；签到失败时缓存可能已过时，下次运行重新获取
+        if self.cache:
+            if failed:
+                self.cache.invalidate(self.token)
+            elif not cached:
+                self.cache.set(self.token, all_roles)
+        
+        if not failed:
+            return {
+                "code": 200,
+                "success": True,
+                "msg": f"{len(role_results)}个角色签到成功",
+                "roles": role_results,
+            }
+        first_fail = failed[0]["result"]
+        return {
+            "code": first_fail.get("code"),
+            "success": False,
+            "msg": f"{len(failed)}/{len(role_results)}个角色签到失败: {first_fail.get('msg')}",
+            "roles": role_results,
+        }
+    
+    def _sign_role(self, role: Dict[str, Any]) -> Dict[str, Any]:
+        """为单个游戏角色签到"""
+        url = f"{API_BASE}/encourage/signIn/v2"
         data = {
             "gameId": role.get("gameId", 2),
             "serverId": role.get("serverId"),
             "roleId": role.get("roleId"),
             "userId": role.get("userId"),
-            "reqMonth": current_month,
+            "reqMonth": datetime.now().strftime("%m"),
         }
+        result = self._make_request(url, data)
         
-        return self._make_request(url, data)
+        if result.get("code") == 200:
+            logger.info(f"账号{self.user_index}: 角色{role.get('roleName') or role.get('roleId')} 签到成功")
+        else:
+            logger.warning(f"账号{self.user_index}: 角色{role.get('roleName') or role.get('roleId')} 签到失败 - {result.get('msg')}")
+        
+        return {
+            "gameId": data["gameId"],
+            "serverId": data["serverId"],
+            "roleId": data["roleId"],
+            "roleName": role.get("roleName"),
+            "result": result,
+        }
     
     def forum_sign(self) -> Dict[str, Any]:
         """执行社区签到"""
         logger.info(f"账号{self.user_index}: 开始社区签到...")
         
-        url = "https://api.kurobbs.com/user/signIn"
+        url = f"{API_BASE}/user/signIn"
         data = {"gameId": 2}
         
         return self._make_request(url, data)
@@ -189,11 +484,24 @@ class KurobbsClient:
             "game_sign": None,
             "forum_sign": None,
             "success": False,
+            "full_success": False,
             "message": ""
         }
         
+        if os.environ.get("KUROBBS_PARALLEL_SIGN", "false").lower() == "true":
+            # 社区签到与游戏签到链(用户信息→角色→签到)互不依赖，同时进行
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                forum_future = executor.submit(self.forum_sign)
+                game_result = self.game_sign()
+                forum_result = forum_future.result()
+        else:
+            game_result = self.game_sign()
+            # 并发模式下由速率限制器控制请求节奏，不再盲等
+            if not self.rate_limiter:
+                time.sleep(random.uniform(1, 3))  # 随机延迟
+            forum_result = self.forum_sign()
+        
         # 游戏签到
-        game_result = self.game_sign()
         results["game_sign"] = game_result
         
         if game_result.get("code") == 200 and game_result.get("success"):
@@ -201,10 +509,7 @@ class KurobbsClient:
         else:
             logger.warning(f"账号{self.user_index}: 游戏签到失败 - {game_result.get('msg')}")
         
-        time.sleep(random.uniform(1, 3))  # 随机延迟
-        
         # 社区签到
-        forum_result = self.forum_sign()
         results["forum_sign"] = forum_result
         
         if forum_result.get("code") == 200 and forum_result.get("success"):
@@ -216,6 +521,8 @@ class KurobbsClient:
         game_success = game_result.get("success") or game_result.get("code") == 200
         forum_success = forum_result.get("success") or forum_result.get("code") == 200
         
+        results["full_success"] = bool(game_success and forum_success)
+        
         if game_success and forum_success:
             results["success"] = True
             results["message"] = "游戏和社区签到均成功"
@@ -249,6 +556,10 @@ def format_results_for_notification(results_list: List[Dict[str, Any]]) -> str:
             game_code = result["game_sign"].get("code")
             game_success = result["game_sign"].get("success", False)
             game_msg = "游戏:" + ("成功" if game_success or game_code == 200 else "失败")
+            roles = result["game_sign"].get("roles") or []
+            if len(roles) > 1:
+                role_ok = sum(1 for r in roles if r["result"].get("code") == 200)
+                game_msg += f"[{role_ok}/{len(roles)}角色]"
         
         forum_msg = ""
         if result.get("forum_sign"):
@@ -328,6 +639,72 @@ def send_notification(title: str, content: str):
             logger.error(f"Server酱通知发送失败: {e}")
 
 
+def process_account(token: str, idx: int, rate_limiter: Optional[RateLimiter] = None,
+                    cache: Optional[TokenCache] = None) -> Dict[str, Any]:
+    """处理单个账号的签到"""
+    logger.info(f"🔐 处理第 {idx} 个账号")
+    
+    if initialize.ledger_signed_today("kurobbs", token.strip()):
+        logger.info(f"⏭️  账号{idx} 今日已签到成功，跳过")
+        return {
+            "user_index": idx,
+            "success": True,
+            "skipped": True,
+            "message": "今日已签到，跳过"
+        }
+    
+    try:
+        client = KurobbsClient(token, user_index=idx, rate_limiter=rate_limiter, cache=cache)
+        result = client.execute_all_sign()
+        
+        # 游戏和社区都成功才记录，部分失败的账号重跑时仍会处理
+        if result.get("full_success"):
+            initialize.ledger_record("kurobbs", token.strip())
+        
+        if result.get("success"):
+            logger.info(f"✅ 账号{idx} 签到完成: {result.get('message')}")
+        else:
+            logger.warning(f"⚠️  账号{idx} 签到存在问题: {result.get('message')}")
+        return result
+            
+    except Exception as e:
+        logger.error(f"❌ 账号{idx} 执行出错: {str(e)}")
+        return {
+            "user_index": idx,
+            "success": False,
+            "message": f"执行出错: {str(e)}"
+        }
+
+
+def run_serial(tokens: List[str], cache: Optional[TokenCache] = None) -> List[Dict[str, Any]]:
+    """逐个账号执行签到，账号间随机延迟"""
+    all_results = []
+    
+    for idx, token in enumerate(tokens, 1):
+        logger.info("-" * 40)
+        result = process_account(token, idx, cache=cache)
+        all_results.append(result)
+        
+        # 账号间延迟，按签到记录跳过的账号没有发送请求，无需等待
+        if idx < len(tokens) and not result.get("skipped"):
+            delay = random.uniform(3, 8)
+            logger.info(f"等待 {delay:.1f} 秒后处理下一个账号...")
+            time.sleep(delay)
+    
+    return all_results
+
+
+def run_concurrent(tokens: List[str], concurrency: int, rate_limiter: RateLimiter,
+                   cache: Optional[TokenCache] = None) -> List[Dict[str, Any]]:
+    """多账号并发执行签到，结果按账号顺序返回"""
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [
+            executor.submit(process_account, token, idx, rate_limiter, cache)
+            for idx, token in enumerate(tokens, 1)
+        ]
+        return [f.result() for f in futures]
+
+
 def main():
     """主函数"""
     logger.info("=" * 50)
@@ -364,36 +741,28 @@ def main():
     
     logger.info(f"📱 检测到 {len(tokens)} 个账号")
     
+    # 并发配置：KUROBBS_CONCURRENCY>1 时启用并发模式，KUROBBS_RATE_LIMIT 为每秒请求数上限
+    concurrency = int(os.environ.get("KUROBBS_CONCURRENCY", "1") or 1)
+    rate = float(os.environ.get("KUROBBS_RATE_LIMIT", "5") or 0)
+    
+    # 角色列表缓存
+    cache_ttl = int(os.environ.get("KUROBBS_CACHE_TTL", "604800") or 0)
+    cache = None
+    if cache_ttl > 0:
+        cache_file = os.environ.get("KUROBBS_CACHE_FILE") or os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), ".kurobbs_cache.json"
+        )
+        cache = TokenCache(cache_file, cache_ttl)
+    
     # 执行签到
-    all_results = []
+    if concurrency > 1 and len(tokens) > 1:
+        logger.info(f"🚀 并发模式: 并发数 {concurrency}, 限速 {rate} 次/秒")
+        all_results = run_concurrent(tokens, concurrency, RateLimiter(rate), cache)
+    else:
+        all_results = run_serial(tokens, cache)
     
-    for idx, token in enumerate(tokens, 1):
-        logger.info("-" * 40)
-        logger.info(f"🔐 处理第 {idx} 个账号")
-        
-        try:
-            client = KurobbsClient(token, user_index=idx)
-            result = client.execute_all_sign()
-            all_results.append(result)
-            
-            if result.get("success"):
-                logger.info(f"✅ 账号{idx} 签到完成: {result.get('message')}")
-            else:
-                logger.warning(f"⚠️  账号{idx} 签到存在问题: {result.get('message')}")
-                
-        except Exception as e:
-            logger.error(f"❌ 账号{idx} 执行出错: {str(e)}")
-            all_results.append({
-                "user_index": idx,
-                "success": False,
-                "message": f"执行出错: {str(e)}"
-            })
-        
-        # 账号间延迟
-        if idx < len(tokens):
-            delay = random.uniform(3, 8)
-            logger.info(f"等待 {delay:.1f} 秒后处理下一个账号...")
-            time.sleep(delay)
+    if cache:
+        cache.save()
     
     logger.info("=" * 50)
     
@@ -421,6 +790,14 @@ def main():
     print(notification_message)
     print("=" * 50)
     
+    # 打印各接口耗时统计
+    trace_lines = TRACER.summary_lines()
+    if trace_lines:
+        print("⏱️  接口耗时统计:")
+        for line in trace_lines:
+            print(line)
+        print("=" * 50)
+    
     # 如果有token过期的账号，给出提示
     token_expired = any(
         "过期" in str(r.get("message", "")) or 
@@ -10,11 +10,14 @@ import threading
 import time
 import urllib.parse
 import smtplib
+from concurrent.futures import Future, FIRST_COMPLETED, wait
 from email.mime.text import MIMEText
 from email.header import Header
 from email.utils import formataddr
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 
 # 原先的 print 函数和主线程的锁
 _print = print
@@ -96,6 +99,13 @@ push_config = {
     'SMTP_EMAIL': '',                   # SMTP 收发件邮箱，通知将会由自己发给自己
     'SMTP_PASSWORD': '',                # SMTP 登录密码，也可能为特殊口令，视具体邮件服务商说明而定
     'SMTP_NAME': '',                    # SMTP 收发件人姓名，可随意填写
+
+    'NOTIFY_MAX_WORKERS': 8,            # 同时进行的推送渠道数
+    'NOTIFY_CHANNEL_TIMEOUT': 15,       # 单个推送渠道的超时时间（秒）
+    'NOTIFY_DEADLINE': 30,              # 一次 send 的总截止时间（秒），超时的渠道不再等待
+    'NOTIFY_CONNECT_TIMEOUT': 5,        # 推送请求的连接超时（秒）
+    'NOTIFY_READ_TIMEOUT': 15,          # 推送请求的读取超时（秒）
+    'NOTIFY_RETRIES': 0,                # 推送请求遇到连接错误或 429/5xx 时的重试次数，默认不重试
 }
 notify_function = []
 # fmt: on
@@ -107,6 +117,50 @@ for k in push_config:
         push_config[k] = v
 
 
+class _TimeoutSession(requests.Session):
+    """
+    未指定 timeout 的请求使用默认的连接/读取超时。
+    """
+
+    def __init__(self, timeout) -> None:
+        super().__init__()
+        self.default_timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.default_timeout)
+        return super().request(method, url, **kwargs)
+
+
+def _build_session() -> requests.Session:
+    """
+    所有推送渠道共用的连接池，多次调用 send 时复用已建立的连接。
+    """
+    http = _TimeoutSession(
+        (
+            float(push_config.get("NOTIFY_CONNECT_TIMEOUT")),
+            float(push_config.get("NOTIFY_READ_TIMEOUT")),
+        )
+    )
+    retry = Retry(
+        total=int(push_config.get("NOTIFY_RETRIES")),
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=None,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=16,
+        pool_maxsize=int(push_config.get("NOTIFY_MAX_WORKERS")),
+        max_retries=retry,
+    )
+    http.mount("https://", adapter)
+    http.mount("http://", adapter)
+    return http
+
+
+session = _build_session()
+
+
 def bark(title: str, content: str) -> None:
     """
     使用 bark 推送消息。
@@ -138,7 +192,7 @@ def bark(title: str, content: str) -> None:
         params += f"{bark_params.get(pair[0])}={pair[1]}&"
     if params:
         url = url + "?" + params.rstrip("&")
-    response = requests.get(url).json()
+    response = session.get(url).json()
 
     if response["code"] == 200:
         print("bark 推送成功！")
@@ -173,7 +227,7 @@ def dingding_bot(title: str, content: str) -> None:
     url = f'https://oapi.dingtalk.com/robot/send?access_token={push_config.get("DD_BOT_TOKEN")}&timestamp={timestamp}&sign={sign}'
     headers = {"Content-Type": "application/json;charset=utf-8"}
     data = {"msgtype": "text", "text": {"content": f"{title}\n\n{content}"}}
-    response = requests.post(
+    response = session.post(
         url=url, data=json.dumps(data), headers=headers, timeout=15
     ).json()
 
@@ -194,7 +248,7 @@ def feishu_bot(title: str, content: str) -> None:
 
     url = f'https://open.feishu.cn/open-apis/bot/v2/hook/{push_config.get("FSKEY")}'
     data = {"msg_type": "text", "content": {"text": f"{title}\n\n{content}"}}
-    response = requests.post(url, data=json.dumps(data)).json()
+    response = session.post(url, data=json.dumps(data)).json()
 
     if response.get("StatusCode") == 0:
         print("飞书 推送成功！")
@@ -212,7 +266,7 @@ def go_cqhttp(title: str, content: str) -> None:
     print("go-cqhttp 服务启动")
 
     url = f'{push_config.get("GOBOT_URL")}?access_token={push_config.get("GOBOT_TOKEN")}&{push_config.get("GOBOT_QQ")}&message=标题:{title}\n内容:{content}'
-    response = requests.get(url).json()
+    response = session.get(url).json()
 
     if response["status"] == "ok":
         print("go-cqhttp 推送成功！")
@@ -235,7 +289,7 @@ def gotify(title: str, content: str) -> None:
         "message": content,
         "priority": push_config.get("GOTIFY_PRIORITY"),
     }
-    response = requests.post(url, data=data).json()
+    response = session.post(url, data=data).json()
 
     if response.get("id"):
         print("gotify 推送成功！")
@@ -255,7 +309,7 @@ def iGot(title: str, content: str) -> None:
     url = f'https://push.hellyw.com/{push_config.get("IGOT_PUSH_KEY")}'
     data = {"title": title, "content": content}
     headers = {"Content-Type": "application/x-www-form-urlencoded"}
-    response = requests.post(url, data=data, headers=headers).json()
+    response = session.post(url, data=data, headers=headers).json()
 
     if response["ret"] == 0:
         print("iGot 推送成功！")
@@ -277,7 +331,7 @@ def serverJ(title: str, content: str) -> None:
         url = f'https://sctapi.ftqq.com/{push_config.get("PUSH_KEY")}.send'
     else:
         url = f'https://sc.ftqq.com/${push_config.get("PUSH_KEY")}.send'
-    response = requests.post(url, data=data).json()
+    response = session.post(url, data=data).json()
 
     if response.get("errno") == 0 or response.get("code") == 0:
         print("serverJ 推送成功！")
@@ -303,7 +357,7 @@ def pushdeer(title: str, content: str) -> None:
     if push_config.get("DEER_URL"):
         url = push_config.get("DEER_URL")
 
-    response = requests.post(url, data=data).json()
+    response = session.post(url, data=data).json()
 
     if len(response.get("content").get("result")) > 0:
         print("PushDeer 推送成功！")
@@ -321,7 +375,7 @@ def chat(title: str, content: str) -> None:
     print("chat 服务启动")
     data = "payload=" + json.dumps({"text": title + "\n" + content})
     url = push_config.get("CHAT_URL") + push_config.get("CHAT_TOKEN")
-    response = requests.post(url, data=data)
+    response = session.post(url, data=data)
 
     if response.status_code == 200:
         print("Chat 推送成功！")
@@ -347,7 +401,7 @@ def pushplus_bot(title: str, content: str) -> None:
     }
     body = json.dumps(data).encode(encoding="utf-8")
     headers = {"Content-Type": "application/json"}
-    response = requests.post(url=url, data=body, headers=headers).json()
+    response = session.post(url=url, data=body, headers=headers).json()
 
     if response["code"] == 200:
         print("PUSHPLUS 推送成功！")
@@ -356,7 +410,7 @@ def pushplus_bot(title: str, content: str) -> None:
 
         url_old = "http://pushplus.hxtrip.com/send"
         headers["Accept"] = "application/json"
-        response = requests.post(url=url_old, data=body, headers=headers).json()
+        response = session.post(url=url_old, data=body, headers=headers).json()
 
         if response["code"] == 200:
             print("PUSHPLUS(hxtrip) 推送成功！")
@@ -376,7 +430,7 @@ def qmsg_bot(title: str, content: str) -> None:
 
     url = f'https://qmsg.zendee.cn/{push_config.get("QMSG_TYPE")}/{push_config.get("QMSG_KEY")}'
     payload = {"msg": f'{title}\n\n{content.replace("----", "-")}'.encode("utf-8")}
-    response = requests.post(url=url, params=payload).json()
+    response = session.post(url=url, params=payload).json()
 
     if response["code"] == 0:
         print("qmsg 推送成功！")
@@ -419,27 +473,88 @@ def wecom_app(title: str, content: str) -> None:
         print("企业微信推送失败！错误信息如下：\n", response)
 
 
+# 企业微信 access_token 缓存：进程内存 + 本地文件，多个脚本共用，按 expires_in 过期
+WECOM_TOKEN_FILE = os.getenv("WECOM_TOKEN_FILE") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), ".wecom_token.json"
+)
+WECOM_TOKEN_EXPIRED_CODES = (40014, 42001)  # access_token 无效或已过期
+_wecom_tokens = {}
+_wecom_token_lock = threading.Lock()
+
+
+def _load_wecom_tokens() -> dict:
+    try:
+        with open(WECOM_TOKEN_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_wecom_token(key: str, token: str, expires_at: float) -> None:
+    tokens = _load_wecom_tokens()
+    now = time.time()
+    tokens = {k: v for k, v in tokens.items() if v.get("expires_at", 0) > now}
+    tokens[key] = {"access_token": token, "expires_at": expires_at}
+    tmp_path = f"{WECOM_TOKEN_FILE}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(tokens, f)
+        os.replace(tmp_path, WECOM_TOKEN_FILE)
+    except OSError as e:
+        print(f"企业微信 access_token 缓存写入失败：{e}")
+
+
 class WeCom:
     def __init__(self, corpid, corpsecret, agentid):
         self.CORPID = corpid
         self.CORPSECRET = corpsecret
         self.AGENTID = agentid
 
-    def get_access_token(self):
-        url = "https://qyapi.weixin.qq.com/cgi-bin/gettoken"
-        values = {
-            "corpid": self.CORPID,
-            "corpsecret": self.CORPSECRET,
-        }
-        req = requests.post(url, params=values)
-        data = json.loads(req.text)
-        return data["access_token"]
+    def _token_key(self):
+        return hashlib.sha256(
+            f"{self.CORPID}:{self.CORPSECRET}".encode("utf-8")
+        ).hexdigest()
+
+    def get_access_token(self, force_refresh=False):
+        key = self._token_key()
+        with _wecom_token_lock:
+            if not force_refresh:
+                cached = _wecom_tokens.get(key) or _load_wecom_tokens().get(key)
+                if cached and cached.get("expires_at", 0) > time.time():
+                    _wecom_tokens[key] = cached
+                    return cached["access_token"]
+
+            url = "https://qyapi.weixin.qq.com/cgi-bin/gettoken"
+            values = {
+                "corpid": self.CORPID,
+                "corpsecret": self.CORPSECRET,
+            }
+            req = session.post(url, params=values)
+            data = json.loads(req.text)
+            # 提前 5 分钟视为过期，避免发送时恰好失效
+            expires_at = time.time() + int(data.get("expires_in", 7200)) - 300
+            _wecom_tokens[key] = {
+                "access_token": data["access_token"],
+                "expires_at": expires_at,
+            }
+            _save_wecom_token(key, data["access_token"], expires_at)
+            return data["access_token"]
+
+    def _send(self, send_values):
+        send_msges = bytes(json.dumps(send_values), "utf-8")
+        for attempt in range(2):
+            send_url = (
+                "https://qyapi.weixin.qq.com/cgi-bin/message/send?access_token="
+                + self.get_access_token(force_refresh=attempt > 0)
+            )
+            respone = session.post(send_url, send_msges)
+            respone = respone.json()
+            # 缓存的 access_token 已失效时刷新后重发一次
+            if respone.get("errcode") not in WECOM_TOKEN_EXPIRED_CODES:
+                break
+        return respone["errmsg"]
 
     def send_text(self, message, touser="@all"):
-        send_url = (
-            "https://qyapi.weixin.qq.com/cgi-bin/message/send?access_token="
-            + self.get_access_token()
-        )
         send_values = {
             "touser": touser,
             "msgtype": "text",
@@ -447,16 +562,9 @@ class WeCom:
             "text": {"content": message},
             "safe": "0",
         }
-        send_msges = bytes(json.dumps(send_values), "utf-8")
-        respone = requests.post(send_url, send_msges)
-        respone = respone.json()
-        return respone["errmsg"]
+        return self._send(send_values)
 
     def send_mpnews(self, title, message, media_id, touser="@all"):
-        send_url = (
-            "https://qyapi.weixin.qq.com/cgi-bin/message/send?access_token="
-            + self.get_access_token()
-        )
         send_values = {
             "touser": touser,
             "msgtype": "mpnews",
@@ -474,10 +582,7 @@ class WeCom:
                 ]
             },
         }
-        send_msges = bytes(json.dumps(send_values), "utf-8")
-        respone = requests.post(send_url, send_msges)
-        respone = respone.json()
-        return respone["errmsg"]
+        return self._send(send_values)
 
 
 def wecom_bot(title: str, content: str) -> None:
@@ -492,7 +597,7 @@ def wecom_bot(title: str, content: str) -> None:
     url = f"https://qyapi.weixin.qq.com/cgi-bin/webhook/send?key={push_config.get('QYWX_KEY')}"
     headers = {"Content-Type": "application/json;charset=utf-8"}
     data = {"msgtype": "text", "text": {"content": f"{title}\n\n{content}"}}
-    response = requests.post(
+    response = session.post(
         url=url, data=json.dumps(data), headers=headers, timeout=15
     ).json()
 
@@ -537,7 +642,7 @@ def telegram_bot(title: str, content: str) -> None:
             push_config.get("TG_PROXY_HOST"), push_config.get("TG_PROXY_PORT")
         )
         proxies = {"http": proxyStr, "https": proxyStr}
-    response = requests.post(
+    response = session.post(
         url=url, headers=headers, params=payload, proxies=proxies
     ).json()
 
@@ -578,7 +683,7 @@ def aibotk(title: str, content: str) -> None:
         }
     body = json.dumps(data).encode(encoding="utf-8")
     headers = {"Content-Type": "application/json"}
-    response = requests.post(url=url, data=body, headers=headers).json()
+    response = session.post(url=url, data=body, headers=headers).json()
     print(response)
     if response["code"] == 0:
         print("智能微秘书 推送成功！")
@@ -644,7 +749,7 @@ def one() -> str:
     :return:
     """
     url = "https://v1.hitokoto.cn/"
-    res = requests.get(url).json()
+    res = session.get(url).json()
     return res["hitokoto"] + "    ----" + res["from"]
 
 
@@ -694,29 +799,96 @@ if (
     notify_function.append(smtp)
 
 
-def send(title: str, content: str) -> None:
+class BoundedExecutor:
+    """
+    有界的守护线程执行器。超时未完成的任务不会阻塞 send 返回，也不会阻塞进程退出。
+    """
+
+    def __init__(self, max_workers: int) -> None:
+        self._slots = threading.BoundedSemaphore(max(1, max_workers))
+
+    def submit(self, fn, *args) -> Future:
+        future = Future()
+        future.started_at = None
+
+        def runner():
+            with self._slots:
+                if not future.set_running_or_notify_cancel():
+                    return
+                future.started_at = time.monotonic()
+                try:
+                    future.set_result(fn(*args))
+                except BaseException as e:
+                    future.set_exception(e)
+
+        threading.Thread(target=runner, name=getattr(fn, "__name__", None), daemon=True).start()
+        return future
+
+
+executor = BoundedExecutor(int(push_config.get("NOTIFY_MAX_WORKERS")))
+
+
+def run_with_deadline(tasks: dict, channel_timeout: float, deadline: float) -> list:
+    """
+    等待 {future: 渠道名} 中的任务，单个渠道从开始执行起超过 channel_timeout 秒、
+    或整体超过 deadline 秒仍未完成的视为超时，返回超时的渠道名。
+    """
+    pending = dict(tasks)
+    missed = []
+    end = time.monotonic() + deadline
+    while pending:
+        now = time.monotonic()
+        for future, name in list(pending.items()):
+            if future.done():
+                del pending[future]
+                if future.exception():
+                    print(f"{name} 推送异常：{future.exception()}")
+            elif future.started_at and now - future.started_at >= channel_timeout:
+                del pending[future]
+                missed.append(name)
+        if not pending:
+            break
+        if now >= end:
+            missed.extend(pending.values())
+            for future in pending:
+                future.cancel()
+            break
+        wait(pending, timeout=min(0.5, end - now), return_when=FIRST_COMPLETED)
+    return missed
+
+
+def send(title: str, content: str) -> list:
+    """
+    并发调用所有已配置的推送渠道，返回未在规定时间内完成的渠道名。
+    """
     if not content:
         print(f"{title} 推送内容为空！")
-        return
+        return []
 
     # 根据标题跳过一些消息推送，环境变量：SKIP_PUSH_TITLE 用回车分隔
     skipTitle = os.getenv("SKIP_PUSH_TITLE")
     if skipTitle:
         if title in re.split("\n", skipTitle):
             print(f"{title} 在SKIP_PUSH_TITLE环境变量内，跳过推送！")
-            return
+            return []
 
     hitokoto = push_config.get("HITOKOTO")
 
     text = one() if hitokoto else ""
     content += "\n\n" + text
 
-    ts = [
-        threading.Thread(target=mode, args=(title, content), name=mode.__name__)
+    tasks = {
+        executor.submit(mode, title, content): mode.__name__
         for mode in notify_function
-    ]
-    [t.start() for t in ts]
-    [t.join() for t in ts]
+    }
+    missed = run_with_deadline(
+        tasks,
+        float(push_config.get("NOTIFY_CHANNEL_TIMEOUT")),
+        float(push_config.get("NOTIFY_DEADLINE")),
+    )
+    if missed:
+        print(f"以下推送渠道未在规定时间内完成，已放弃等待：{', '.join(missed)}")
+    return missed
 
 
 def main():
@@ -5,6 +5,7 @@
 
 import sys
 import os, re
+import threading
 import requests
 import json
 import time
@@ -312,23 +313,78 @@ def wecom_app(title, content):
         print(e)
 
 
+# 企业微信 access_token 缓存：进程内存 + 本地文件，与 notify.py 共用同一文件
+WECOM_TOKEN_FILE = os.getenv('WECOM_TOKEN_FILE') or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '.wecom_token.json')
+WECOM_TOKEN_EXPIRED_CODES = (40014, 42001)  # access_token 无效或已过期
+_wecom_tokens = {}
+_wecom_token_lock = threading.Lock()
+
+
+def _load_wecom_tokens():
+    try:
+        with open(WECOM_TOKEN_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_wecom_token(key, token, expires_at):
+    now = time.time()
+    tokens = {k: v for k, v in _load_wecom_tokens().items() if v.get('expires_at', 0) > now}
+    tokens[key] = {'access_token': token, 'expires_at': expires_at}
+    tmp_path = WECOM_TOKEN_FILE + '.tmp'
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(tokens, f)
+        os.replace(tmp_path, WECOM_TOKEN_FILE)
+    except OSError as e:
+        print(f'企业微信 access_token 缓存写入失败：{e}')
+
+
 class WeCom:
     def __init__(self, corpid, corpsecret, agentid):
         self.CORPID = corpid
         self.CORPSECRET = corpsecret
         self.AGENTID = agentid
 
-    def get_access_token(self):
-        url = 'https://qyapi.weixin.qq.com/cgi-bin/gettoken'
-        values = {'corpid': self.CORPID,
-                  'corpsecret': self.CORPSECRET,
-                  }
-        req = requests.post(url, params=values)
-        data = json.loads(req.text)
-        return data["access_token"]
+    def _token_key(self):
+        return hashlib.sha256(f'{self.CORPID}:{self.CORPSECRET}'.encode('utf-8')).hexdigest()
+
+    def get_access_token(self, force_refresh=False):
+        key = self._token_key()
+        with _wecom_token_lock:
+            if not force_refresh:
+                cached = _wecom_tokens.get(key) or _load_wecom_tokens().get(key)
+                if cached and cached.get('expires_at', 0) > time.time():
+                    _wecom_tokens[key] = cached
+                    return cached['access_token']
+
+            url = 'https://qyapi.weixin.qq.com/cgi-bin/gettoken'
+            values = {'corpid': self.CORPID,
+                      'corpsecret': self.CORPSECRET,
+                      }
+            req = requests.post(url, params=values)
+            data = json.loads(req.text)
+            # 提前 5 分钟视为过期，避免发送时恰好失效
+            expires_at = time.time() + int(data.get('expires_in', 7200)) - 300
+            _wecom_tokens[key] = {'access_token': data['access_token'], 'expires_at': expires_at}
+            _save_wecom_token(key, data['access_token'], expires_at)
+            return data["access_token"]
+
+    def _send(self, send_values):
+        send_msges = (bytes(json.dumps(send_values), 'utf-8'))
+        for attempt in range(2):
+            send_url = 'https://qyapi.weixin.qq.com/cgi-bin/message/send?access_token=' + \
+                       self.get_access_token(force_refresh=attempt > 0)
+            respone = requests.post(send_url, send_msges)
+            respone = respone.json()
+            # 缓存的 access_token 已失效时刷新后重发一次
+            if respone.get('errcode') not in WECOM_TOKEN_EXPIRED_CODES:
+                break
+        return respone["errmsg"]
 
     def send_text(self, message, touser="@all"):
-        send_url = 'https://qyapi.weixin.qq.com/cgi-bin/message/send?access_token=' + self.get_access_token()
         send_values = {
             "touser": touser,
             "msgtype": "text",
@@ -338,13 +394,9 @@ class WeCom:
             },
             "safe": "0"
         }
-        send_msges = (bytes(json.dumps(send_values), 'utf-8'))
-        respone = requests.post(send_url, send_msges)
-        respone = respone.json()
-        return respone["errmsg"]
+        return self._send(send_values)
 
     def send_mpnews(self, title, message, media_id, touser="@all"):
-        send_url = 'https://qyapi.weixin.qq.com/cgi-bin/message/send?access_token=' + self.get_access_token()
         send_values = {
             "touser": touser,
             "msgtype": "mpnews",
@@ -362,10 +414,7 @@ class WeCom:
                 ]
             }
         }
-        send_msges = (bytes(json.dumps(send_values), 'utf-8'))
-        respone = requests.post(send_url, send_msges)
-        respone = respone.json()
-        return respone["errmsg"]
+        return self._send(send_values)
 
 
 def send(title, content):
@@ -2,60 +2,251 @@
 """
 cron: 1 0 0 * * *
 new Env('SteamTools');
+多账号: STEAMTOOLS_COOKIE 和 STEAMTOOLS_USER 均用 & 分隔，按顺序一一对应
+可选环境变量:
+  STEAMTOOLS_CONCURRENCY  同时签到的账号数，默认5
+  STEAMTOOLS_FORMHASH_TTL formhash本地缓存有效期(秒)，默认86400，0为不缓存
+  STEAMTOOLS_FORMHASH_FILE formhash缓存文件，默认脚本目录下 .steamtools_formhash.json
+  STEAMTOOLS_FIRE_AT      预热模式的签到时刻(本地时间 HH:MM:SS，如 00:00:00)，
+                          设置后提前建立连接、准备formhash，到点只发送签到请求；
+                          需要把定时改为提前几秒启动，例如 50 59 23 * * *
+  STEAMTOOLS_PREWARM_MAX  预热模式最长等待秒数，默认120，超过则立即签到
+每个账号输出一行JSON结果(含各阶段耗时)，退出码:
+  0 签到成功  1 签到失败  2 环境变量配置错误  3 今日已签到  4 Cookie无效  5 网络错误（多账号时取最严重的）
 """
 
 from sendNotify import send
-from curl_cffi import requests
+from curl_cffi import CurlHttpVersion
+from curl_cffi.requests import AsyncSession, Cookies
+import initialize
+import asyncio
 import re
 import os
+import sys
+import codecs
+import json
+import time
+from datetime import datetime, timedelta
+
+# 页头退出链接里的 formhash=xxxxxxxx 出现得最早，帖子底部回复框里的 input 作为兜底
+FORMHASH_PATTERN = re.compile(r'formhash=([0-9a-zA-Z]{8})\b|name="formhash" value="(.+?)"')
+
+# 签到返回这些内容时说明formhash已失效，需要重新获取
+FORMHASH_INVALID_MARKERS = ("表单验证串不符", "请求来路不正确")
+
+FORMHASH_TTL = int(os.getenv("STEAMTOOLS_FORMHASH_TTL", "86400") or 0)
+FORMHASH_FILE = os.getenv("STEAMTOOLS_FORMHASH_FILE") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), ".steamtools_formhash.json"
+)
+
+
+def get_cached_formhash(cookie):
+    """读取该cookie未过期的formhash"""
+    if FORMHASH_TTL <= 0:
+        return ''
+    entry = initialize.load_json_cache(FORMHASH_FILE).get(initialize.account_key(cookie))
+    if not entry or time.time() - entry.get("updated", 0) > FORMHASH_TTL:
+        return ''
+    return entry.get("formhash", '')
+
+
+def set_cached_formhash(cookie, formhash):
+    """保存或清除(formhash为空)该cookie的formhash"""
+    if FORMHASH_TTL <= 0:
+        return
+    cache = initialize.load_json_cache(FORMHASH_FILE)
+    if formhash:
+        cache[initialize.account_key(cookie)] = {"formhash": formhash, "updated": time.time()}
+    elif cache.pop(initialize.account_key(cookie), None) is None:
+        return
+    initialize.save_json_cache(FORMHASH_FILE, cache)
+
+# 结果分类及对应的退出码，多账号时按此顺序取最严重的一个
+STATUS_SUCCESS = "success"
+STATUS_ALREADY_SIGNED = "already_signed"
+STATUS_FAILED = "failed"
+STATUS_COOKIE_INVALID = "cookie_invalid"
+STATUS_NETWORK_ERROR = "network_error"
+STATUS_CONFIG_ERROR = "config_error"  # 环境变量缺失或不匹配，不会进入签到流程
+EXIT_CODES = {
+    STATUS_SUCCESS: 0,
+    STATUS_CONFIG_ERROR: 2,
+    STATUS_ALREADY_SIGNED: 3,
+    STATUS_FAILED: 1,
+    STATUS_COOKIE_INVALID: 4,
+    STATUS_NETWORK_ERROR: 5,
+}
+STATUS_SEVERITY = [STATUS_SUCCESS, STATUS_ALREADY_SIGNED, STATUS_FAILED, STATUS_COOKIE_INVALID, STATUS_NETWORK_ERROR]
+
+
+def exit_code_for(results):
+    """多账号结果中最严重状态对应的退出码"""
+    if not results:
+        return EXIT_CODES[STATUS_SUCCESS]
+    worst = max((r["status"] for r in results), key=STATUS_SEVERITY.index)
+    return EXIT_CODES[worst]
+
+
+def new_session(max_clients=10):
+    """创建长连接会话：HTTP/2、chrome指纹，签到的各阶段和所有账号共用"""
+    return AsyncSession(
+        impersonate="chrome120",
+        verify=False,
+        http_version=CurlHttpVersion.V2TLS,
+        max_clients=max(1, max_clients),
+    )
+
+
+def parse_cookie_string(cookie):
+    """把 "a=b; c=d" 形式的cookie转为账号自己的cookie jar"""
+    jar = Cookies()
+    for part in cookie.split(';'):
+        name, sep, value = part.strip().partition('=')
+        if sep and name:
+            jar.set(name, value)
+    return jar
+
+
+def next_fire_time(fire_at, max_wait):
+    """
+    计算预热模式的签到时间戳：取今天或明天的 fire_at 中离现在最近且不超过 max_wait 秒的一个，
+    已错过或太远时返回None(立即签到)；fire_at 不是合法的 HH:MM:SS 时抛出 ValueError
+    """
+    parsed = datetime.strptime(fire_at.strip(), "%H:%M:%S")
+    hour, minute, second = parsed.hour, parsed.minute, parsed.second
+    now = datetime.now()
+    for days in (0, 1):
+        target = (now + timedelta(days=days)).replace(hour=hour, minute=minute, second=second, microsecond=0)
+        wait = (target - now).total_seconds()
+        if 0 <= wait <= max_wait:
+            return target.timestamp()
+    return None
+
+
+async def wait_until(timestamp):
+    """等待到指定时间戳，最后50毫秒主动轮询以减少定时误差"""
+    remaining = timestamp - time.time()
+    if remaining > 0.05:
+        await asyncio.sleep(remaining - 0.05)
+    while time.time() < timestamp:
+        await asyncio.sleep(0)
+
 
 class SteamTools:
-    def __init__(self, cookie, username):
+    def __init__(self, cookie, username, session=None):
         self.cookie = cookie
         self.username = username
         self.formhash = ''
+        self.session = session
+        self.cookies = parse_cookie_string(cookie)
+        self.status = STATUS_FAILED
+        self.timings = {"connect": None, "check_cookie": None, "do_signin": None}
+
+    async def _timed(self, phase, coro):
+        """执行并累计某个阶段的耗时(毫秒)"""
+        start = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.timings[phase] = round((self.timings[phase] or 0) + elapsed, 1)
+
+    def _finish(self, success, message):
+        """生成账号结果并输出一行JSON"""
+        result = {
+            "script": "steamtools",
+            "username": self.username,
+            "success": bool(success),
+            "status": self.status,
+            "message": message,
+            "timings_ms": self.timings,
+        }
+        print(json.dumps(result, ensure_ascii=False))
+        return result
+
+    async def _request(self, method, url, **kwargs):
+        """
+        使用共享会话发送请求，cookie取自账号自己的jar，响应中的新cookie只写回该账号，
+        并清空会话级的jar，避免多个账号共用会话时cookie互相串用
+        """
+        response = await self.session.request(
+            method, url, cookies=self.cookies, verify=False, impersonate="chrome120", **kwargs
+        )
+        self.cookies.update(response.cookies)
+        self.session.cookies.clear()
+        return response
 
-    def check_cookie(self):
+    async def check_cookie(self):
         """检查cookie有效性并获取formhash"""
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Cookie': self.cookie,
             'Referer': 'https://bbs.steamtools.net/'
         }
         
         try:
-            response = requests.get(
+            response = await self._request(
+                'GET',
                 'https://bbs.steamtools.net/forum.php?mod=viewthread&tid=8741',
                 headers=headers,
                 timeout=15,
-                verify=False,
-                impersonate="chrome120"
+                stream=True
             )
             
             if response.status_code != 200:
+                await response.aclose()
+                self.status = STATUS_NETWORK_ERROR
                 return False, f"页面访问失败，状态码: {response.status_code}"
+            
+            # 流式读取页面，formhash和用户名都在页头，找到后立即停止下载
+            decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+            text = ''
+            searchObj = None
+            user_found = False
+            try:
+                async for chunk in response.aiter_content():
+                    text += decoder.decode(chunk)
+                    if not searchObj:
+                        searchObj = FORMHASH_PATTERN.search(text)
+                    if not user_found:
+                        user_found = self.username in text
+                    if searchObj and user_found:
+                        break
+            finally:
+                await response.aclose()
                 
             # 提取formhash
-            searchObj = re.search(r'name="formhash" value="(.+?)"', response.text)
             if not searchObj:
+                self.status = STATUS_COOKIE_INVALID
                 return False, "无法获取formhash，Cookie可能已失效"
                 
-            self.formhash = searchObj.group(1)
+            self.formhash = searchObj.group(1) or searchObj.group(2)
             
             # 验证用户名
-            if self.username not in response.text:
+            if not user_found:
+                self.status = STATUS_COOKIE_INVALID
                 return False, "Cookie验证失败，用户名不匹配"
                 
             return True, "Cookie验证成功"
             
         except Exception as e:
+            self.status = STATUS_NETWORK_ERROR
             return False, f"检查Cookie时出错: {str(e)}"
 
-    def do_signin(self):
-        """执行签到"""
+    async def warm_up(self):
+        """预热连接：完成DNS、TLS和浏览器指纹握手，之后的签到请求复用该连接"""
+        try:
+            await self._request(
+                'HEAD',
+                'https://bbs.steamtools.net/robots.txt',
+                timeout=15
+            )
+        except Exception as e:
+            print(f"[-] [{self.username}] 预热连接失败: {str(e)}")
+
+    async def do_signin(self):
+        """执行签到，返回 (True/False/None, 说明)，None 表示formhash已失效"""
         headers = {
             'Content-Type': 'application/x-www-form-urlencoded',
-            'Cookie': self.cookie,
             'Referer': 'https://bbs.steamtools.net/forum.php?mod=viewthread&tid=8741',
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Origin': 'https://bbs.steamtools.net'
@@ -64,55 +255,165 @@ class SteamTools:
         data = f'formhash={self.formhash}&signsubmit=yes&handlekey=signin&emotid=3&referer=https%3A%2F%2Fbbs.steamtools.net%2Fforum.php%3Fmod%3Dviewthread%26tid%3D8741&content=%E4%B8%BA%E4%BA%86%E7%BB%B4%E6%8A%A4%E5%AE%87%E5%AE%99%E5%92%8C%E5%B9%B3%EF%BC%8C%E6%89%93%E8%B5%B7%E7%B2%BE%E7%A5%9E%E6%9D%A5%EF%BC%81%7E%7E'
         
         try:
-            response = requests.post(
+            response = await self._request(
+                'POST',
                 'https://bbs.steamtools.net/plugin.php?id=dc_signin:sign&inajax=1',
                 headers=headers,
                 data=data,
-                timeout=30,
-                verify=False,
-                impersonate="chrome120"
+                timeout=30
             )
             
             if "您今日已经签过到" in response.text:
+                self.status = STATUS_ALREADY_SIGNED
                 return True, "已经签到过了，不再重复签到!"
             elif "签到成功" in response.text or "succeedhandle_signin" in response.text:
+                self.status = STATUS_SUCCESS
                 return True, "签到成功!"
+            elif any(marker in response.text for marker in FORMHASH_INVALID_MARKERS):
+                return None, "formhash已失效"
             else:
+                self.status = STATUS_FAILED
                 return False, f"签到失败: {response.text}"
                 
         except Exception as e:
+            self.status = STATUS_NETWORK_ERROR
             return False, f"签到请求失败: {str(e)}"
 
-    def start(self):
-        """主流程"""
-        print("[*] 开始steamtools签到任务")
+    async def run(self, fire_at=None):
+        """
+        检查Cookie并签到，返回结果dict(含状态分类和各阶段耗时)，不发送通知
+        fire_at: 预热模式的签到时间戳，提前完成签到前的所有准备，到点才发送签到请求
+        """
+        print(f"[*] [{self.username}] 开始steamtools签到任务")
         
-        # 检查Cookie
-        success, message = self.check_cookie()
-        if not success:
-            print(f"[-] {message}")
-            send("steamtools 签到结果", f"❌ 失败: {message}")
-            return
+        self.formhash = get_cached_formhash(self.cookie)
+        if fire_at is not None:
+            # 预热：建立连接并准备好formhash
+            if self.formhash:
+                await self._timed("connect", self.warm_up())
+            else:
+                success, message = await self._timed("check_cookie", self.check_cookie())
+                if not success:
+                    print(f"[-] [{self.username}] {message}")
+                    return self._finish(False, message)
+                print(f"[+] [{self.username}] {message}")
+                set_cached_formhash(self.cookie, self.formhash)
+            print(f"[*] [{self.username}] 预热完成，等待 {datetime.fromtimestamp(fire_at):%H:%M:%S} 签到")
+            await wait_until(fire_at)
         
-        print(f"[+] {message}")
+        # 今日已签到成功则不再发送请求（预热模式到点后才判断，此时已是新的一天）
+        if initialize.ledger_signed_today("steamtools", self.username):
+            print(f"[+] [{self.username}] 今日已签到成功，跳过")
+            self.status = STATUS_ALREADY_SIGNED
+            return self._finish(True, "今日已签到成功，跳过")
         
-        # 执行签到
-        success, result = self.do_signin()
+        # 有缓存的formhash时跳过check_cookie直接签到
+        success = None
+        if self.formhash:
+            print(f"[*] [{self.username}] 使用缓存的formhash签到")
+            success, result = await self._timed("do_signin", self.do_signin())
+            # formhash失效或无法识别的响应(如Cookie过期后的未登录页)都重新检查Cookie，网络错误除外
+            if success is None or (success is False and self.status == STATUS_FAILED):
+                print(f"[*] [{self.username}] 缓存的formhash签到未成功，重新检查Cookie并获取formhash")
+                set_cached_formhash(self.cookie, '')
+                success = None
+        
+        if success is None:
+            # 检查Cookie
+            success, message = await self._timed("check_cookie", self.check_cookie())
+            if not success:
+                print(f"[-] [{self.username}] {message}")
+                return self._finish(False, message)
+            
+            print(f"[+] [{self.username}] {message}")
+            set_cached_formhash(self.cookie, self.formhash)
+            
+            # 执行签到
+            success, result = await self._timed("do_signin", self.do_signin())
+            if success is None:
+                self.status = STATUS_FAILED
+            success = bool(success)
         
-        # 发送通知
         if success:
-            print(f"[+] {result}")
-            send("steamtools 签到结果", f"✅ SteamTools签到成功!\n{result}")
+            print(f"[+] [{self.username}] {result}")
+            initialize.ledger_record("steamtools", self.username)
         else:
-            print(f"[-] {result}")
-            send("steamtools 签到结果", f"❌ SteamTools签到失败!\n{result}")
+            print(f"[-] [{self.username}] {result}")
+        return self._finish(success, result)
 
-if __name__ == "__main__":
-    cookie = os.getenv("STEAMTOOLS_COOKIE")
-    username = os.getenv("STEAMTOOLS_USER")
-    
-    if not cookie or not username:
+    async def _run_with_session(self):
+        async with new_session() as session:
+            self.session = session
+            return await self.run()
+
+    def start(self):
+        """单账号主流程"""
+        result = asyncio.run(self._run_with_session())
+        
+        # 发送通知
+        if result["success"]:
+            send("steamtools 签到结果", f"✅ SteamTools签到成功!\n{result['message']}")
+        else:
+            send("steamtools 签到结果", f"❌ SteamTools签到失败!\n{result['message']}")
+        return result
+
+
+async def run_accounts(accounts, concurrency, fire_at=None):
+    """多账号并发签到，accounts 为 [(cookie, username), ...]，结果按账号顺序返回"""
+    if fire_at is not None:
+        # 预热模式下所有账号需要同时在线等待签到时刻
+        concurrency = len(accounts)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    # 所有账号共用一个长连接会话，每个账号的cookie保存在各自的jar中
+    async with new_session(concurrency) as session:
+        async def run_one(cookie, username):
+            async with semaphore:
+                return await SteamTools(cookie, username, session).run(fire_at)
+
+        return await asyncio.gather(*(run_one(cookie, username) for cookie, username in accounts))
+
+
+def main():
+    cookie_env = os.getenv("STEAMTOOLS_COOKIE")
+    username_env = os.getenv("STEAMTOOLS_USER")
+
+    if not cookie_env or not username_env:
         print("[-] 请设置 STEAMTOOLS_COOKIE 和 STEAMTOOLS_USER 环境变量")
         send("steamtools 签到结果", "❌ 环境变量未设置完整")
-    else:
-        SteamTools(cookie, username).start()
+        sys.exit(EXIT_CODES[STATUS_CONFIG_ERROR])
+
+    cookies = [c.strip() for c in cookie_env.split("&") if c.strip()]
+    usernames = [u.strip() for u in username_env.split("&") if u.strip()]
+    if not cookies or len(cookies) != len(usernames):
+        print(f"[-] STEAMTOOLS_COOKIE({len(cookies)}个) 与 STEAMTOOLS_USER({len(usernames)}个) 为空或数量不一致")
+        send("steamtools 签到结果", "❌ STEAMTOOLS_COOKIE 与 STEAMTOOLS_USER 为空或数量不一致")
+        sys.exit(EXIT_CODES[STATUS_CONFIG_ERROR])
+
+    concurrency = int(os.getenv("STEAMTOOLS_CONCURRENCY", "5") or 1)
+    fire_at = None
+    if os.getenv("STEAMTOOLS_FIRE_AT"):
+        try:
+            max_wait = int(os.getenv("STEAMTOOLS_PREWARM_MAX", "120") or 0)
+            fire_at = next_fire_time(os.getenv("STEAMTOOLS_FIRE_AT"), max_wait)
+        except ValueError as e:
+            print(f"[-] STEAMTOOLS_FIRE_AT/STEAMTOOLS_PREWARM_MAX 配置无效({e})，应为 HH:MM:SS 和秒数，立即签到")
+        else:
+            if fire_at is None:
+                print(f"[*] 距离 {os.getenv('STEAMTOOLS_FIRE_AT')} 超过{max_wait}秒或已错过，立即签到")
+    results = asyncio.run(run_accounts(list(zip(cookies, usernames)), concurrency, fire_at))
+
+    # 所有账号汇总为一条通知
+    success_count = sum(1 for r in results if r["success"])
+    lines = [
+        f"{'✅' if r['success'] else '❌'} {r['username']}: {r['message']}"
+        for r in results
+    ]
+    send(f"steamtools 签到结果({success_count}/{len(results)})", "\n".join(lines))
+
+    # 按最严重的结果设置退出码
+    sys.exit(exit_code_for(results))
+
+
+if __name__ == "__main__":
+    main()